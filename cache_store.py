@@ -0,0 +1,125 @@
+import os
+import json
+import tempfile
+
+# 預寫日誌 (write-ahead log) 副檔名，例如 json_data.json.log
+LOG_SUFFIX = ".log"
+
+def log_path(json_name):
+    return json_name + LOG_SUFFIX
+
+def _file_mode(path):
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+def atomic_write_json(json_name, json_data):
+    """
+    先寫入同目錄的暫存檔，fsync 後再以 os.replace 取代原檔
+    - 中途被中斷時原檔保持完整，不會出現被截斷的 JSON
+    """
+    directory = os.path.dirname(os.path.abspath(json_name))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=directory)
+    try:
+        # mkstemp 建立的檔案權限為 0600，沿用原檔權限 (新檔則依 umask)
+        os.chmod(tmp_path, _file_mode(json_name))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(json_data, f, ensure_ascii=False, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, json_name)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # 目錄 fsync，確保 rename 本身也已落盤 (Windows 不支援則略過)
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+def _repair_torn_tail(path):
+    """
+    上次追加中途被中斷時，日誌最後一行會沒有換行
+    截掉這段不完整的紀錄，避免下一筆被接在同一行而一起被略過
+    """
+    try:
+        with open(path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+
+            # 往回找最後一個換行，其後即為不完整的紀錄
+            pos = size
+            while pos > 0:
+                step = min(4096, pos)
+                pos -= step
+                f.seek(pos)
+                idx = f.read(step).rfind(b"\n")
+                if idx != -1:
+                    pos += idx + 1
+                    break
+            f.truncate(pos)
+            f.flush()
+            os.fsync(f.fileno())
+            print(f"{path} 有不完整的紀錄，已截除")
+    except FileNotFoundError:
+        pass
+
+def append_log(json_name, entries):
+    """
+    將新資料以 JSON Lines 追加到日誌，每筆一行並立即 fsync
+    entries: { "YYYYMMDD": value }
+    """
+    if not entries:
+        return
+    _repair_torn_tail(log_path(json_name))
+    with open(log_path(json_name), "a", encoding="utf-8") as f:
+        for key, value in entries.items():
+            f.write(json.dumps({key: value}, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def read_log(json_name):
+    """
+    讀取日誌並依序重播，最後一行若因中斷而不完整則忽略
+    回傳: { "YYYYMMDD": value }
+    """
+    entries = {}
+    try:
+        with open(log_path(json_name), "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"{log_path(json_name)} 有不完整的紀錄，已略過")
+                    continue
+                if isinstance(record, dict):
+                    entries.update(record)
+    except FileNotFoundError:
+        pass
+    return entries
+
+def clear_log(json_name):
+    """主檔已完整寫入後清除日誌"""
+    try:
+        os.remove(log_path(json_name))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,118 @@
+import json
+import numpy as np
+import pandas as pd
+from cache_store import atomic_write_json
+
+# 證交所明確回覆沒有交易資料的工作日 (休市日)，下次檢查時不再列入缺漏
+HOLIDAYS_JSON = "holidays.json"
+# 重新下載後數值不變的異常跳動 (真實行情)，{ "YYYYMMDD": 數值 }，數值相同時不再列為異常
+CONFIRMED_JSON = "confirmed.json"
+
+def _load_sidecar(json_name, default):
+    try:
+        with open(json_name, "r", encoding="utf-8") as f:
+            return json.load(f) or default
+    except FileNotFoundError:
+        return default
+    except json.JSONDecodeError:
+        print(f"{json_name} 格式錯誤")
+        return default
+
+def load_holidays(json_name=HOLIDAYS_JSON):
+    return set(_load_sidecar(json_name, []))
+
+def save_holidays(holidays, json_name=HOLIDAYS_JSON):
+    atomic_write_json(json_name, sorted(holidays))
+
+def load_confirmed(json_name=CONFIRMED_JSON):
+    return dict(_load_sidecar(json_name, {}))
+
+def save_confirmed(confirmed, json_name=CONFIRMED_JSON):
+    atomic_write_json(json_name, dict(sorted(confirmed.items())))
+
+def validate_cache(cache, holidays=(), accepted=None, start=None, end=None, window=61, spike_threshold=8.0):
+    """
+    一次掃描整個快取 { "YYYYMMDD": 股價淨值比 < 1 家數 }，全部使用向量化運算
+    holidays: 已知休市日 ["YYYYMMDD", ...]，不列入缺漏
+    accepted: 已確認為真實行情的跳動 { "YYYYMMDD": 數值 }，快取數值相同時不列為異常
+    start / end: 檢查區間，預設為快取中的第一天與最後一天
+    window: 計算一般日變動幅度的滾動視窗
+    spike_threshold: 單日跳動且隔日反轉，幅度超過一般變動幾倍視為異常
+
+    回傳 dict:
+        malformed -> 無法解析的 key 或非數值、負值、假日日期 { key: 原因 }
+        gaps      -> 應有資料但缺少的工作日 ["YYYYMMDD", ...]
+        outliers  -> 單日異常跳動的日期 { "YYYYMMDD": 分數 }
+        refetch   -> 需重新下載的最小日期清單 (gaps + outliers + 可解析的錯誤日期)
+        remove    -> 無法解析或落在假日、應直接刪除的 key
+    """
+    keys = pd.Series(list(cache.keys()), dtype=object)
+    values = pd.to_numeric(pd.Series(list(cache.values()), dtype=object), errors="coerce")
+
+    # ------------------------ malformed ------------------------
+    key_str = keys.astype(str)
+    well_formed = key_str.str.fullmatch(r"\d{8}")
+    dates = pd.to_datetime(key_str.where(well_formed), format="%Y%m%d", errors="coerce")
+
+    reasons = pd.Series("", index=keys.index)
+    reasons[dates.isna()] = "日期格式錯誤"
+    reasons[dates.notna() & (dates.dt.weekday >= 5)] = "假日不應有資料"
+    reasons[dates.notna() & values.isna()] = "數值無法解析"
+    reasons[dates.notna() & (values < 0)] = "數值為負"
+    bad = reasons != ""
+
+    malformed = dict(zip(key_str[bad], reasons[bad]))
+    remove = key_str[bad & (dates.isna() | (dates.dt.weekday >= 5))].tolist()
+    refetch_bad = key_str[bad & dates.notna() & (dates.dt.weekday < 5)].tolist()
+
+    # ------------------------ series ------------------------
+    series = pd.Series(values[~bad].to_numpy(dtype=float), index=dates[~bad]).sort_index()
+    series = series[~series.index.duplicated(keep="last")]
+
+    if series.empty:
+        return {"malformed": malformed, "gaps": [], "outliers": {},
+                "refetch": sorted(refetch_bad), "remove": remove}
+
+    # ------------------------ gaps ------------------------
+    start = pd.Timestamp(start) if start else series.index.min()
+    end = pd.Timestamp(end) if end else series.index.max()
+    expected = pd.bdate_range(start, end)
+    if holidays:
+        expected = expected.difference(pd.to_datetime(list(holidays), format="%Y%m%d"))
+    gaps = expected.difference(series.index).strftime("%Y%m%d").tolist()
+
+    # ------------------------ outliers ------------------------
+    # 與前一日、後一日的變動方向相反 (跳上去又跳回來)，以兩者較小者除以一般日變動幅度為分數
+    diff_in = series.diff()
+    diff_out = -series.diff(-1)
+    scale = diff_in.abs().rolling(window, center=True, min_periods=5).median()
+    scale = scale.where(scale > 0, 1.0)
+
+    score = np.minimum(diff_in.abs(), diff_out.abs()) / scale
+    score = score.where(np.sign(diff_in) != np.sign(diff_out), 0.0).fillna(0.0)
+    if accepted:
+        # 只有數值與確認時相同才略過，之後若被改動仍會再次檢查
+        confirmed = pd.Series({pd.Timestamp(k): float(v) for k, v in accepted.items()})
+        score = score.where(~(series == confirmed.reindex(series.index)), 0.0)
+    spikes = score[score > spike_threshold]
+    outliers = dict(zip(spikes.index.strftime("%Y%m%d"), spikes.round(2).astype(float)))
+
+    refetch = sorted(set(gaps) | set(outliers) | set(refetch_bad))
+
+    return {
+        "malformed": malformed,
+        "gaps": gaps,
+        "outliers": outliers,
+        "refetch": refetch,
+        "remove": remove,
+    }
+
+def show_report(report):
+    print(f"格式錯誤: {len(report['malformed'])} 筆")
+    for k, reason in report["malformed"].items():
+        print(f"  {k}: {reason}")
+    print(f"缺漏日期: {len(report['gaps'])} 筆")
+    print(f"異常跳動: {len(report['outliers'])} 筆")
+    for k, score in report["outliers"].items():
+        print(f"  {k}: {score}")
+    print(f"需重新下載: {len(report['refetch'])} 筆，需刪除: {len(report['remove'])} 筆")
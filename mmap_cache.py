@@ -0,0 +1,237 @@
+import os
+import json
+import struct
+import tempfile
+import numpy as np
+from cache_store import _file_mode
+
+try:
+    import fcntl
+except ImportError:  # Windows 無 fcntl，僅能由使用者自行確保單一寫入者
+    fcntl = None
+
+# 檔頭: magic(4s) + version(H) + 欄位數(H) + 筆數(Q) + 欄位名稱 (每個 16 bytes)
+MAGIC = b"PBRC"
+VERSION = 1
+NAME_SIZE = 16
+_HEAD = struct.Struct("<4sHHQ")
+_COUNT_OFFSET = 8
+DEFAULT_COLUMNS = ("pbr_lt1",)
+
+def _header_size(n_cols):
+    size = _HEAD.size + NAME_SIZE * n_cols
+    return (size + 7) // 8 * 8
+
+def _record_dtype(columns):
+    # 日期以 YYYYMMDD 整數儲存，其餘欄位一律 float64 (缺值為 NaN)
+    return np.dtype([("date", "<i4")] + [(c, "<f8") for c in columns])
+
+class MMapSeries:
+    """
+    可被多個行程以唯讀 memmap 共用的二進位日期序列
+    - 每筆紀錄固定長度，依日期遞增排列，讀取端不需解析、不複製資料
+    - 寫入端只能追加較新的日期，先寫資料再更新檔頭筆數，讀取端不會看到寫一半的紀錄
+    預設欄位 ["pbr_lt1"] 對應 json_data.json 的 股價淨值比 < 1 家數，
+    個股可另開檔案並指定欄位，例如 ["pe", "dy", "pb", "close"]
+    readonly=True 時檔案不存在會拋出 FileNotFoundError，且不能 append
+    """
+
+    def __init__(self, path, columns=None, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        if readonly:
+            self.columns = self._read_columns()
+        else:
+            try:
+                self.columns = list(columns or DEFAULT_COLUMNS)
+                self._create()
+            except FileExistsError:
+                self.columns = self._read_columns()
+
+        if columns is not None and list(columns) != self.columns:
+            raise ValueError(f"{path} 的欄位為 {self.columns}，與指定的 {list(columns)} 不符")
+        self.dtype = _record_dtype(self.columns)
+        self.header_size = _header_size(len(self.columns))
+
+    # ------------------------ header ------------------------
+    def _create(self):
+        for c in self.columns:
+            if len(c.encode("utf-8")) > NAME_SIZE:
+                raise ValueError(f"欄位名稱過長 (上限 {NAME_SIZE} bytes)：{c}")
+
+        header = bytearray(_header_size(len(self.columns)))
+        _HEAD.pack_into(header, 0, MAGIC, VERSION, len(self.columns), 0)
+        for i, c in enumerate(self.columns):
+            start = _HEAD.size + i * NAME_SIZE
+            header[start:start + NAME_SIZE] = c.encode("utf-8").ljust(NAME_SIZE, b"\0")
+
+        # 先把完整檔頭寫進暫存檔，再以 os.link 發佈：目標已存在時 link 會失敗 (FileExistsError)，
+        # 多個行程同時建立時只有一個會成功，其餘行程讀到的一定是完整檔頭
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".bin", dir=directory)
+        try:
+            os.chmod(tmp_path, _file_mode(self.path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                f.flush()
+                os.fsync(f.fileno())
+            os.link(tmp_path, self.path)
+        finally:
+            os.remove(tmp_path)
+
+    def _read_columns(self):
+        with open(self.path, "rb") as f:
+            head = f.read(_HEAD.size)
+            if len(head) < _HEAD.size:
+                raise ValueError(f"{self.path} 檔頭不完整，不是有效的 MMapSeries 檔案")
+            magic, version, n_cols, _ = _HEAD.unpack(head)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{self.path} 不是有效的 MMapSeries 檔案")
+            raw = f.read(NAME_SIZE * n_cols)
+            if len(raw) < NAME_SIZE * n_cols:
+                raise ValueError(f"{self.path} 檔頭不完整，不是有效的 MMapSeries 檔案")
+        return [raw[i * NAME_SIZE:(i + 1) * NAME_SIZE].rstrip(b"\0").decode("utf-8")
+                for i in range(n_cols)]
+
+    def __len__(self):
+        with open(self.path, "rb") as f:
+            return _HEAD.unpack(f.read(_HEAD.size))[3]
+
+    # ------------------------ reader ------------------------
+    def open(self):
+        """
+        以唯讀 memmap 開啟目前已提交的紀錄
+        回傳: numpy structured array，可用 arr["date"]、arr["pbr_lt1"] 取得欄位 (皆為零複製 view)
+        """
+        count = len(self)
+        if count == 0:
+            return np.empty(0, dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode="r",
+                         offset=self.header_size, shape=(count,))
+
+    def lookup(self, date_str, column=None):
+        """以二分搜尋取得指定日期的值，找不到回傳 None"""
+        arr = self.open()
+        key = int(date_str)
+        pos = np.searchsorted(arr["date"], key)
+        if pos >= len(arr) or arr["date"][pos] != key:
+            return None
+        value = arr[column or self.columns[0]][pos]
+        return None if np.isnan(value) else float(value)
+
+    def to_dict(self, column=None):
+        """轉回與 json_data.json 相同格式的 { "YYYYMMDD": value }"""
+        arr = self.open()
+        values = arr[column or self.columns[0]]
+        return {str(d): (int(v) if float(v).is_integer() else float(v))
+                for d, v in zip(arr["date"], values) if not np.isnan(v)}
+
+    # ------------------------ writer ------------------------
+    def append(self, data_dict, column=None):
+        """
+        追加比現有最後一天更新的日期，舊日期會被略過
+        data_dict: { "YYYYMMDD": value } 或 { "YYYYMMDD": {column: value, ...} }
+        回傳: 實際寫入的筆數
+        """
+        if self.readonly:
+            raise PermissionError(f"{self.path} 以唯讀模式開啟，不能寫入")
+
+        with open(self.path, "r+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                count = _HEAD.unpack(f.read(_HEAD.size))[3]
+
+                last = -1
+                if count:
+                    f.seek(self.header_size + (count - 1) * self.dtype.itemsize)
+                    last = int(np.frombuffer(f.read(4), dtype="<i4")[0])
+
+                keys = sorted(k for k in data_dict if int(k) > last)
+                if not keys:
+                    return 0
+
+                records = np.zeros(len(keys), dtype=self.dtype)
+                records["date"] = [int(k) for k in keys]
+                for c in self.columns:
+                    records[c] = np.nan
+                for i, k in enumerate(keys):
+                    value = data_dict[k]
+                    if isinstance(value, dict):
+                        for c, v in value.items():
+                            records[c][i] = np.nan if v is None else v
+                    else:
+                        records[column or self.columns[0]][i] = np.nan if value is None else value
+
+                # 先寫資料並落盤，再更新檔頭筆數 (提交點)
+                f.seek(self.header_size + count * self.dtype.itemsize)
+                f.truncate()
+                f.write(records.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+                f.seek(_COUNT_OFFSET)
+                f.write(struct.pack("<Q", count + len(keys)))
+                f.flush()
+                os.fsync(f.fileno())
+                return len(keys)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def _json_arrays(data):
+    """把 { "YYYYMMDD": value } 轉成依日期排序的 (日期 int32, 數值 float64)，略過格式錯誤的 key"""
+    keys = sorted(k for k in data if len(str(k)) == 8 and str(k).isdigit())
+    dates = np.array([int(k) for k in keys], dtype="<i4")
+    values = np.full(len(keys), np.nan)
+    for i, k in enumerate(keys):
+        try:
+            values[i] = float(data[k])
+        except (TypeError, ValueError):
+            pass
+    return keys, dates, values
+
+def _rebuild(bin_name, columns, data, column):
+    tmp_name = bin_name + ".tmp"
+    if os.path.exists(tmp_name):
+        os.remove(tmp_name)
+    added = MMapSeries(tmp_name, columns=columns).append(data, column=column)
+    os.replace(tmp_name, bin_name)
+    return added
+
+def sync_from_json(json_name="json_data.json", bin_name="json_data.bin", column="pbr_lt1"):
+    """
+    把 json 快取同步到二進位檔，回傳淨增加筆數
+    - 只有新日期時直接追加
+    - json 對已存在的日期有補檔、修改或刪除時，重建整個檔案並以 os.replace 取代，
+      已開啟的讀取端仍持有舊檔，不受影響
+    """
+    try:
+        with open(json_name, "r", encoding="utf-8") as f:
+            data = json.load(f) or {}
+    except (FileNotFoundError, json.JSONDecodeError):
+        print(f"{json_name} 無法讀取，略過同步")
+        return 0
+
+    keys, dates, values = _json_arrays(data)
+    data = {k: data[k] for k in keys}
+
+    series = MMapSeries(bin_name, columns=None if os.path.exists(bin_name) else (column,))
+    existing = series.open()
+    if column not in series.columns:
+        raise ValueError(f"{bin_name} 沒有欄位 {column}")
+
+    if len(existing):
+        # 與已存在區間逐筆比對日期與數值，不一致就重建
+        old = dates <= existing["date"][-1]
+        same = (np.array_equal(dates[old], existing["date"])
+                and np.array_equal(values[old], existing[column], equal_nan=True))
+        if not same:
+            added = _rebuild(bin_name, series.columns, data, column)
+            print(f"偵測到已存在日期有異動，已重建 {bin_name} 共 {added} 筆")
+            return added - len(existing)
+
+    added = series.append(data, column=column)
+    print(f"已同步 {added} 筆資料到 {bin_name}")
+    return added
@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+
+# 指標欄位 -> (日期欄位, 價格欄位)
+# value3 來自 calc_indicator_pandas，percent_b_diff 來自 PlotPBDif.main 合併後的 DataFrame
+INDICATOR_COLUMNS = {
+    "value3": ("date", "close"),
+    "percent_b_diff": ("日期", "Close"),
+}
+
+def _prepare_arrays(df, signal_col, date_col=None, price_col=None):
+    """
+    依日期排序並取出 (日期, 指標, 收盤價) 三個 numpy 陣列
+    - 未指定欄位時依 INDICATOR_COLUMNS 自動判斷
+    - 指標或收盤價為 NaN 的列會被移除
+    """
+    default_date, default_price = INDICATOR_COLUMNS.get(signal_col, ("date", "close"))
+    date_col = date_col or default_date
+    price_col = price_col or default_price
+
+    data = df[[date_col, signal_col, price_col]].copy()
+    if not pd.api.types.is_datetime64_any_dtype(data[date_col]):
+        data[date_col] = pd.to_datetime(data[date_col].astype(str), format="%Y%m%d")
+    data[signal_col] = pd.to_numeric(data[signal_col], errors="coerce")
+    data[price_col] = pd.to_numeric(data[price_col], errors="coerce")
+    data = data.dropna().sort_values(date_col).reset_index(drop=True)
+
+    return (data[date_col].to_numpy(),
+            data[signal_col].to_numpy(dtype=float),
+            data[price_col].to_numpy(dtype=float))
+
+def _positions(values, entry, exit, direction="above"):
+    """
+    以門檻值產生持倉矩陣 (T, P)，1 = 持有，0 = 空手
+    values: 指標序列 (T,)
+    entry / exit: 每組參數的進出場門檻 (P,)
+    direction: "above" -> 指標 >= entry 進場、<= exit 出場
+               "below" -> 指標 <= entry 進場、>= exit 出場
+    """
+    v = values[:, None]
+    if direction == "above":
+        enter = v >= entry[None, :]
+        leave = v <= exit[None, :]
+    elif direction == "below":
+        enter = v <= entry[None, :]
+        leave = v >= exit[None, :]
+    else:
+        raise ValueError(f"direction 只能是 'above' 或 'below'：{direction}")
+
+    # 進場訊號優先，其餘時間沿用前一個狀態
+    state = np.full(enter.shape, np.nan)
+    state[leave] = 0.0
+    state[enter] = 1.0
+    return pd.DataFrame(state).ffill().fillna(0.0).to_numpy()
+
+def _simulate(values, prices, entry, exit, direction="above", fee=0.0):
+    """
+    一次計算 P 組參數的回測結果，全部使用陣列運算
+    回傳 dict：position / returns / equity / drawdown 為 (T, P)，其餘為 (P,)
+    """
+    entry = np.atleast_1d(np.asarray(entry, dtype=float))
+    exit = np.atleast_1d(np.asarray(exit, dtype=float))
+    n_bars, n_sets = len(values), len(entry)
+
+    pos = _positions(values, entry, exit, direction)
+    prev_pos = np.vstack([np.zeros((1, n_sets)), pos[:-1]])
+
+    # 收盤價報酬 (第一筆為 0)，持倉以前一日狀態計算，換倉時扣除手續費
+    price_ret = np.zeros(n_bars)
+    if n_bars > 1:
+        price_ret[1:] = prices[1:] / prices[:-1] - 1
+    strat_ret = prev_pos * price_ret[:, None] - fee * np.abs(pos - prev_pos)
+
+    equity = np.cumprod(1 + strat_ret, axis=0)
+    drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+
+    # 交易編號：進場當日開始累加，出場當日仍屬於同一筆交易
+    entries = (pos == 1) & (prev_pos == 0)
+    trade_id = np.cumsum(entries, axis=0)
+    in_trade = (pos == 1) | (prev_pos == 1)
+
+    # 以 bincount 彙總每筆交易的對數報酬
+    log_ret = np.log1p(strat_ret)
+    keys = (np.arange(n_sets)[None, :] * (n_bars + 1) + trade_id)[in_trade]
+    size = n_sets * (n_bars + 1)
+    trade_sum = np.bincount(keys, weights=log_ret[in_trade], minlength=size).reshape(n_sets, -1)
+    trade_cnt = np.bincount(keys, minlength=size).reshape(n_sets, -1)
+
+    has_trade = trade_cnt > 0
+    n_trades = has_trade.sum(axis=1)
+    n_wins = (has_trade & (trade_sum > 0)).sum(axis=1)
+    hit_rate = np.divide(n_wins, n_trades, out=np.full(n_sets, np.nan), where=n_trades > 0)
+
+    return {
+        "position": pos,
+        "returns": strat_ret,
+        "equity": equity,
+        "drawdown": drawdown,
+        "total_return": equity[-1] - 1 if n_bars else np.zeros(n_sets),
+        "max_drawdown": drawdown.min(axis=0) if n_bars else np.zeros(n_sets),
+        "trades": n_trades,
+        "hit_rate": hit_rate,
+        "exposure": pos.mean(axis=0) if n_bars else np.zeros(n_sets),
+    }
+
+def backtest_indicator(df, signal_col="value3", entry=0, exit=0, direction="above",
+                       fee=0.0, date_col=None, price_col=None):
+    """
+    單組參數回測
+    df: calc_indicator_pandas 或 PlotPBDif.main 回傳的 DataFrame
+    signal_col: "value3" 或 "percent_b_diff"
+    entry / exit: 進出場門檻
+    direction: "above" 指標向上突破 entry 進場；"below" 指標向下跌破 entry 進場
+    fee: 每次換倉的成本比例 (例如 0.001425)
+    回傳: (逐筆結果 DataFrame, 績效統計 dict)
+    """
+    dates, values, prices = _prepare_arrays(df, signal_col, date_col, price_col)
+    res = _simulate(values, prices, entry, exit, direction, fee)
+
+    curve = pd.DataFrame({
+        "date": dates,
+        signal_col: values,
+        "close": prices,
+        "position": res["position"][:, 0],
+        "returns": res["returns"][:, 0],
+        "equity": res["equity"][:, 0],
+        "drawdown": res["drawdown"][:, 0],
+    })
+    stats = {
+        "total_return": float(res["total_return"][0]),
+        "max_drawdown": float(res["max_drawdown"][0]),
+        "trades": int(res["trades"][0]),
+        "hit_rate": float(res["hit_rate"][0]),
+        "exposure": float(res["exposure"][0]),
+    }
+    return curve, stats
+
+def run_grid(frames, entries, exits, signal_col="value3", direction="above",
+             fee=0.0, date_col=None, price_col=None):
+    """
+    多檔股票 x 多組參數的批次回測
+    frames: { 股票代號: 指標 DataFrame }，也可直接傳入單一 DataFrame
+    entries / exits: 進出場門檻候選值，會展開成所有組合一次計算
+    回傳: 每列為 (ticker, entry, exit) 的績效統計 DataFrame，依 total_return 由高到低排序
+    """
+    if isinstance(frames, pd.DataFrame):
+        frames = {"": frames}
+
+    grid_entry, grid_exit = np.meshgrid(np.asarray(entries, dtype=float),
+                                        np.asarray(exits, dtype=float), indexing="ij")
+    grid_entry, grid_exit = grid_entry.ravel(), grid_exit.ravel()
+
+    summaries = []
+    for ticker, df in frames.items():
+        _, values, prices = _prepare_arrays(df, signal_col, date_col, price_col)
+        if len(values) == 0:
+            print(f"{ticker} 無指標資料可回測")
+            continue
+
+        res = _simulate(values, prices, grid_entry, grid_exit, direction, fee)
+        summaries.append(pd.DataFrame({
+            "ticker": ticker,
+            "entry": grid_entry,
+            "exit": grid_exit,
+            "total_return": res["total_return"],
+            "max_drawdown": res["max_drawdown"],
+            "trades": res["trades"],
+            "hit_rate": res["hit_rate"],
+            "exposure": res["exposure"],
+        }))
+
+    if not summaries:
+        return pd.DataFrame(columns=["ticker", "entry", "exit", "total_return",
+                                     "max_drawdown", "trades", "hit_rate", "exposure"])
+
+    result = pd.concat(summaries, ignore_index=True)
+    return result.sort_values("total_return", ascending=False).reset_index(drop=True)
@@ -0,0 +1,83 @@
+import time
+import threading
+import pandas as pd
+import yfinance as yf
+from datetime import datetime, timedelta
+
+# 個股歷史股價快取 { ticker_symbol: (抓取時間, start, end, hist) }
+PRICE_CACHE_TTL = 3600
+_price_cache = {}
+_price_lock = threading.Lock()
+
+def pick_first_workday_each_week(data_dict):
+    """
+    從輸入字典中，依照每週挑出第一個有效工作日。
+    優先順序：星期一 -> 星期二 -> ... -> 星期日
+    同一 ISO 週內星期越小日期越早，因此等同於取每週最早的日期，
+    週的順序依輸入中第一次出現的順序排列
+    """
+    if not data_dict:
+        return {}
+
+    keys = list(data_dict.keys())
+    dates = pd.to_datetime(pd.Series(keys), format="%Y%m%d")
+    iso = dates.dt.isocalendar()
+
+    df = pd.DataFrame({"key": keys, "date": dates, "year": iso["year"], "week": iso["week"]})
+    first = df.loc[df.groupby(["year", "week"], sort=False)["date"].idxmin()]
+
+    return {d.strftime("%Y%m%d"): data_dict[k] for k, d in zip(first["key"], first["date"])}
+
+def _ticker_symbol(stock_id):
+    # 股票代號轉成 Yahoo Finance 格式
+    if stock_id == "^TWII":
+        return stock_id
+    return f"{stock_id}.TW"
+
+def _history(ticker_symbol, start, end):
+    """取得 [start, end) 的歷史股價，已抓過且未過期的區間直接使用快取"""
+    now = time.monotonic()
+    with _price_lock:
+        cached = _price_cache.get(ticker_symbol)
+    if cached:
+        fetched_at, c_start, c_end, hist = cached
+        if now - fetched_at < PRICE_CACHE_TTL and c_start <= start and end <= c_end:
+            return hist
+        if now - fetched_at < PRICE_CACHE_TTL:
+            # 擴大區間一次抓齊，避免相鄰查詢重複下載
+            start, end = min(start, c_start), max(end, c_end)
+
+    hist = yf.Ticker(ticker_symbol).history(start=start, end=end)
+    # 網路或代號錯誤時 yfinance 回傳空表，不快取，下次呼叫重新抓取
+    if hist.empty:
+        return hist
+    with _price_lock:
+        _price_cache[ticker_symbol] = (now, start, end, hist)
+    return hist
+
+def clear_price_cache():
+    with _price_lock:
+        _price_cache.clear()
+
+def get_stock_close_batch(date_keys, stock_id):
+    """
+    批次取得台灣個股收盤價
+    date_keys: list of "YYYYMMDD" 字串 (例如 list(w_cache.keys()))
+    stock_id: 股票代號 (數字，例如 2330, 2317)
+    回傳: { "YYYYMMDD": Close }，若該日沒有資料則為 None
+    """
+    # 轉成 datetime.date
+    dates = [datetime.strptime(d, "%Y%m%d").date() for d in date_keys]
+    start = min(dates)
+    end = max(dates) + timedelta(days=1)
+
+    hist = _history(_ticker_symbol(stock_id), start, end)
+    keys = [d.strftime("%Y%m%d") for d in dates]
+    if hist.empty or "Close" not in hist:
+        return {k: None for k in keys}
+
+    # 以日期字串對齊收盤價，同一天重複時取第一筆
+    closes = pd.Series(hist["Close"].to_numpy(dtype=float), index=hist.index.strftime("%Y%m%d"))
+    closes = closes[~closes.index.duplicated()]
+    values = closes.reindex(keys)
+    return {k: (None if pd.isna(v) else float(v)) for k, v in zip(keys, values)}
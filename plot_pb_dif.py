@@ -1,9 +1,10 @@
 
+import time
 import requests
 import pandas as pd
-import yfinance as yf
 import matplotlib.pyplot as plt
-from datetime import datetime, timedelta
+from datetime import datetime
+from pbr_core import get_stock_close_batch
 
 class PlotPBDif:
     def __init__(self):
@@ -62,7 +63,8 @@ class PlotPBDif:
 
         return df
 
-    def get_twse_bwibbu(self, stock_no, start_month):
+    def get_twse_bwibbu(self, stock_no, start_month, interval=0):
+        """interval: 每次請求後暫停的秒數，長時間服務呼叫時用來避免被證交所限流"""
         self.stock_no = stock_no
         self.start_month = start_month
         today = datetime.today().strftime("%Y%m%d")
@@ -76,6 +78,8 @@ class PlotPBDif:
                 date = f"{period.year}{period.month:02d}{day:02d}"
                 url = f"https://www.twse.com.tw//exchangeReport//BWIBBU?date={date}&stockNo={stock_no}&response=json"
                 res = requests.get(url)
+                if interval:
+                    time.sleep(interval)
                 if res.status_code == 200:
                     try:
                         data = res.json()
@@ -116,36 +120,11 @@ class PlotPBDif:
 
     def get_stock_close_batch(self, date_keys, stock_id):
         """
-        批次取得台灣個股收盤價
-        date_keys: list of "YYYYMMDD" 字串 (例如 list(w_cache.keys()))
-        stock_id: 股票代號 (數字，例如 2330, 2317)
+        批次取得台灣個股收盤價 (見 pbr_core.get_stock_close_batch)
         回傳: { "YYYYMMDD": Close }
         """
         self.stock_id = stock_id
-        # 股票代號轉成 Yahoo Finance 格式
-        if stock_id == "^TWII":
-            ticker_symbol = stock_id
-        else:
-            ticker_symbol = f"{stock_id}.TW"
-
-        # 轉成 datetime.date
-        dates = [datetime.strptime(d, "%Y%m%d").date() for d in date_keys]
-        start = min(dates)
-        end = max(dates) + timedelta(days=1)
-
-        # 抓取個股資料
-        stock = yf.Ticker(ticker_symbol)
-        hist = stock.history(start=start, end=end)
-
-        result = {}
-        for d in dates:
-            d_str = d.strftime("%Y%m%d")
-            try:
-                close_price = hist.loc[d.strftime("%Y-%m-%d")]["Close"]
-                result[d_str] = float(close_price)
-            except KeyError:
-                result[d_str] = None  # 若該日沒有資料，填 None
-        return result
+        return get_stock_close_batch(date_keys, stock_id)
 
     def plot_close_and_percent_b_diff(self, df, stock):
         """
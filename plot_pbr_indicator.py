@@ -1,39 +1,7 @@
 
 import pandas as pd
-import yfinance as yf
 import matplotlib.pyplot as plt
-from datetime import datetime, timedelta
-from collections import defaultdict
-
-def pick_first_workday_each_week(data_dict):
-    """
-    從輸入字典中，依照每週挑出第一個有效工作日。
-    優先順序：星期一 -> 星期二 -> ... -> 星期日
-    """
-    # 將 key 轉成 datetime.date
-    parsed = {datetime.strptime(k, "%Y%m%d").date(): v for k, v in data_dict.items()}
-
-    # 依照週分組 (year, week_number)
-    weeks = defaultdict(list)
-    for d in parsed.keys():
-        year, week_num, _ = d.isocalendar()  # isocalendar: (year, week, weekday)
-        weeks[(year, week_num)].append(d)
-
-    result = {}
-    # 每週挑出第一個有效工作日
-    for (year, week_num), days in weeks.items():
-        days_sorted = sorted(days)
-        # 按照星期一到星期日的優先順序
-        for wd in range(7):  # 0=Monday ... 6=Sunday
-            for d in days_sorted:
-                if d.weekday() == wd:
-                    result[d.strftime("%Y%m%d")] = parsed[d]
-                    break
-            else:
-                continue
-            break
-
-    return result
+from pbr_core import pick_first_workday_each_week, get_stock_close_batch
 
 def calc_indicator_pandas(data_dict, close_prices, length=20, band_range=2):
     """
@@ -74,38 +42,6 @@ def calc_indicator_pandas(data_dict, close_prices, length=20, band_range=2):
 
     return df
 
-def get_stock_close_batch(date_keys, stock_id):
-    """
-    批次取得台灣個股收盤價
-    date_keys: list of "YYYYMMDD" 字串 (例如 list(w_cache.keys()))
-    stock_id: 股票代號 (數字，例如 2330, 2317)
-    回傳: { "YYYYMMDD": Close }
-    """
-    # 股票代號轉成 Yahoo Finance 格式
-    if stock_id == "^TWII":
-        ticker_symbol = stock_id
-    else:
-        ticker_symbol = f"{stock_id}.TW"
-
-    # 轉成 datetime.date
-    dates = [datetime.strptime(d, "%Y%m%d").date() for d in date_keys]
-    start = min(dates)
-    end = max(dates) + timedelta(days=1)
-
-    # 抓取個股資料
-    stock = yf.Ticker(ticker_symbol)
-    hist = stock.history(start=start, end=end)
-
-    result = {}
-    for d in dates:
-        d_str = d.strftime("%Y%m%d")
-        try:
-            close_price = hist.loc[d.strftime("%Y-%m-%d")]["Close"]
-            result[d_str] = float(close_price)
-        except KeyError:
-            result[d_str] = None  # 若該日沒有資料，填 None
-    return result
-
 def plot_close_and_value3(df_result, code, text="Day"):
     """
     繪製上下兩個子圖：
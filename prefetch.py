@@ -0,0 +1,132 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+from datetime import datetime, timedelta
+from pbr_core import get_stock_close_batch
+
+def missing_dates(cache, today=None, days=32):
+    """
+    依日曆找出近 days 天內、尚未出現在 cache 的工作日 (不含未來日期)
+    回傳: ["YYYYMMDD", ...] 由舊到新
+    """
+    today = today or datetime.today().strftime("%Y%m%d")
+    dt = datetime.strptime(str(today), "%Y%m%d")
+    dates = []
+    for i in range(days, -1, -1):
+        d = dt - timedelta(days=i)
+        key = d.strftime("%Y%m%d")
+        if d.weekday() < 5 and key not in cache:
+            dates.append(key)
+    return dates
+
+class TWSEPrefetcher:
+    """
+    背景預先下載缺少的日期，呼叫端可同時使用現有 cache
+    - 下載使用 TWSECacheManager.download_twse_status，完成一筆即合併進內部複本並寫入日誌
+    - 傳入的 cache 不會被背景執行緒修改，合併結果只能經由 snapshot() / wait() 取得
+    - 可選擇同時預抓個股收盤價 (get_stock_close_batch)
+    - 證交所請求一次只送一筆，上一筆完成後至少間隔 interval 秒才送下一筆，避免被封鎖
+      (與原本逐筆下載後 sleep 的速率相同)；max_workers 只讓收盤價下載可同時進行
+    - wait() 之後可再次 start()，會建立新的執行緒池
+
+    用法:
+        prefetcher = manager.start_prefetch(cache)
+        ...  # 繼續使用原本的 cache，或以 prefetcher.snapshot() 取得目前進度
+        cache = prefetcher.wait()
+    """
+
+    def __init__(self, manager, cache, json_name="json_data.json", max_workers=2, interval=0.5):
+        self.manager = manager
+        self.cache = dict(cache)
+        self.json_name = json_name
+        self.interval = interval
+        self.closes = {}
+        self.failed = []
+        self.no_data = []
+        self._lock = threading.Lock()
+        self._gate = threading.Lock()
+        self._last_done = 0.0
+        self._max_workers = max_workers
+        self._executor = None
+        self._futures = []
+
+    def _download(self, date_str):
+        """序列化證交所請求，間隔從上一筆下載「完成」起算"""
+        with self._gate:
+            wait = self._last_done + self.interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return self.manager.download_twse_status(date_str)
+            finally:
+                self._last_done = time.monotonic()
+
+    def _fetch_date(self, date_str):
+        status, inf = self._download(date_str)
+        with self._lock:
+            if inf:
+                self.manager.append_json(self.json_name, inf)
+                self.cache.update(inf)
+            else:
+                # failed 包含所有沒拿到資料的日期，no_data 只收證交所明確回覆休市的日期
+                self.failed.append(date_str)
+                if status == "no_data":
+                    self.no_data.append(date_str)
+        return inf
+
+    def _fetch_close(self, stock_id, date_keys):
+        closes = get_stock_close_batch(date_keys, stock_id)
+        with self._lock:
+            self.closes.setdefault(stock_id, {}).update(closes)
+        return closes
+
+    def start(self, dates=None, tickers=(), today=None):
+        """
+        dates: 指定要下載的日期，預設為 missing_dates(cache, today)
+        tickers: 要一併預抓收盤價的股票代號 (例如 "^TWII", 2330)
+        """
+        if dates is None:
+            with self._lock:
+                dates = missing_dates(self.cache, today)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+
+        print(f"背景預先下載 {len(dates)} 個日期")
+        for d in dates:
+            self._futures.append(self._executor.submit(self._fetch_date, d))
+
+        if tickers:
+            with self._lock:
+                date_keys = sorted(set(self.cache) | set(dates))
+            for stock_id in tickers:
+                self._futures.append(self._executor.submit(self._fetch_close, stock_id, date_keys))
+        return self
+
+    def snapshot(self):
+        """取得目前 cache 的複本，不等待背景下載"""
+        with self._lock:
+            return dict(self.cache)
+
+    def done(self):
+        return all(f.done() for f in self._futures)
+
+    def wait(self, timeout=None):
+        """
+        等待所有背景工作完成並回傳合併後的 cache
+        指定 timeout 且逾時時回傳當下的 snapshot()，尚未完成的下載仍會在背景繼續，
+        可再次呼叫 snapshot() 或 done() 查看進度
+        """
+        try:
+            for f in as_completed(self._futures, timeout=timeout):
+                e = f.exception()
+                if e is not None:
+                    print(f"背景下載失敗：{e}")
+        except TimeoutError:
+            print(f"等待逾時，尚有 {sum(not f.done() for f in self._futures)} 項背景工作未完成")
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=timeout is None)
+                self._executor = None
+            self._futures = [f for f in self._futures if not f.done()]
+        return self.snapshot()
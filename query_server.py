@@ -0,0 +1,251 @@
+"""
+本機查詢服務，提供 json_data.json 與指標計算結果，不需 clone repo
+    GET /breadth?start=YYYYMMDD&end=YYYYMMDD        區間查詢
+    GET /breadth/last?n=20                          最近 n 筆
+    GET /breadth/weekly?start=&end=&n=              每週第一個工作日
+    GET /indicator/value3?ticker=2330&freq=week&n=  calc_indicator_pandas
+    GET /indicator/percent_b_diff?ticker=2330&start_month=202401
+回應附帶 ETag，帶 If-None-Match 且內容未變時回傳 304
+指標結果的版本依股價快取的 PRICE_CACHE_TTL 區間更新，空結果不會被快取
+"""
+
+import os
+import json
+import hashlib
+import time
+import threading
+from datetime import datetime
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pandas as pd
+from twse_cache_manager import TWSECacheManager
+from pbr_core import pick_first_workday_each_week, get_stock_close_batch, PRICE_CACHE_TTL
+
+JSON_NAME = "json_data.json"
+_manager = TWSECacheManager(None, None, None)
+_cache_lock = threading.Lock()
+_cache_state = {"version": None, "data": {}}
+
+def _data_version(json_name=None):
+    """以檔案與日誌的 mtime / 大小作為資料版本，檔案有變才重新讀取"""
+    json_name = json_name or JSON_NAME
+    version = []
+    for path in (json_name, json_name + ".log"):
+        try:
+            st = os.stat(path)
+            version.append(f"{st.st_mtime_ns}-{st.st_size}")
+        except FileNotFoundError:
+            version.append("0")
+    return "/".join(version)
+
+def load_cache(json_name=None):
+    json_name = json_name or JSON_NAME
+    version = _data_version(json_name)
+    with _cache_lock:
+        if _cache_state["version"] != version:
+            _cache_state["data"] = dict(sorted(_manager.get_json(json_name).items()))
+            _cache_state["version"] = version
+        return version, _cache_state["data"]
+
+# ------------------------ query ------------------------
+def _parse_n(n):
+    """n 為空表示不限筆數，否則需為 >= 0 的整數"""
+    if n is None or n == "":
+        return None
+    n = int(n)
+    if n < 0:
+        raise ValueError(f"n 必須 >= 0：{n}")
+    return n
+
+def _select(data, start=None, end=None, n=None):
+    keys = list(data.keys())
+    if start:
+        keys = [k for k in keys if k >= start]
+    if end:
+        keys = [k for k in keys if k <= end]
+    n = _parse_n(n)
+    if n is not None:
+        keys = keys[len(keys) - n:] if n else []
+    return {k: data[k] for k in keys}
+
+def _frame_to_records(df, date_col):
+    df = df.copy()
+    if pd.api.types.is_datetime64_any_dtype(df[date_col]):
+        df[date_col] = df[date_col].dt.strftime("%Y%m%d")
+    df = df.astype(object).where(df.notna(), None)
+    return df.to_dict(orient="records")
+
+def breadth(data, start=None, end=None, n=None):
+    return _select(data, start, end, n)
+
+def breadth_weekly(data, start=None, end=None, n=None):
+    weekly = pick_first_workday_each_week(_select(data, start, end))
+    return _select(weekly, n=n)
+
+def indicator_value3(data, ticker, freq="day", start=None, end=None, n=None, length=20, band_range=2):
+    from plot_pbr_indicator import calc_indicator_pandas
+
+    # 先檢查參數，避免格式錯誤時仍去抓股價
+    length, band_range = int(length), float(band_range)
+    series = _select(data, start, end)
+    if freq == "week":
+        series = pick_first_workday_each_week(series)
+    series = _select(series, n=n)
+    if not series:
+        return []
+
+    close_prices = get_stock_close_batch(series, ticker)
+    df = calc_indicator_pandas(series, close_prices, length=length, band_range=band_range)
+    return _frame_to_records(df[["date", "value1", "close", "tsepbr_pb", "c_pb", "value3"]], "date")
+
+# 證交所 BWIBBU 原始資料快取 { (ticker, start_month): (抓取時間, DataFrame) }
+# 同一時間只允許一個請求去爬證交所，且每次請求間隔 BWIBBU_INTERVAL 秒
+BWIBBU_INTERVAL = 0.5
+_bwibbu_cache = {}
+_bwibbu_lock = threading.Lock()
+
+def _get_bwibbu(ticker, start_month):
+    from plot_pb_dif import PlotPBDif
+
+    key = (str(ticker), str(start_month))
+    with _bwibbu_lock:
+        cached = _bwibbu_cache.get(key)
+        if cached and time.monotonic() - cached[0] < PRICE_CACHE_TTL:
+            return cached[1]
+
+        df = PlotPBDif().get_twse_bwibbu(stock_no=ticker, start_month=start_month,
+                                         interval=BWIBBU_INTERVAL)
+        # 下載失敗 (None 或空) 不快取，下次請求再重試
+        if df is not None and len(df):
+            _bwibbu_cache[key] = (time.monotonic(), df)
+        return df
+
+def indicator_percent_b_diff(data, ticker, start_month=None, n=None):
+    from plot_pb_dif import PlotPBDif
+
+    n = _parse_n(n)
+    start_month = start_month or datetime.today().strftime("%Y01")
+    df = _get_bwibbu(ticker, start_month)
+    if df is None or len(df) == 0:
+        return []
+    tdf = PlotPBDif().calculate_indicator(df.copy())
+    if len(tdf) == 0:
+        return []
+    if n is not None:
+        tdf = tdf.tail(n)
+    return _frame_to_records(tdf[["日期", "PE_MA5", "DY_MA5", "PE_percent_b",
+                                  "DY_percent_b", "percent_b_diff"]], "日期")
+
+# 路徑 -> (函式, 是否需要 ticker, 是否使用 json_data.json)
+ROUTES = {
+    "/breadth": (breadth, False, True),
+    "/breadth/last": (breadth, False, True),
+    "/breadth/weekly": (breadth_weekly, False, True),
+    "/indicator/value3": (indicator_value3, True, True),
+    "/indicator/percent_b_diff": (indicator_percent_b_diff, True, False),
+}
+
+def _is_empty(result):
+    """空結果或所有數值皆為 None (通常是下載失敗)"""
+    if not result:
+        return True
+    if isinstance(result, list):
+        return all(v is None for row in result for k, v in row.items() if k not in ("date", "日期"))
+    return False
+
+RENDER_CACHE_SIZE = 256
+_render_cache = OrderedDict()
+_render_lock = threading.Lock()
+
+def render(version, data, path, query):
+    """
+    計算並序列化結果，以 (資料版本, 路徑, 參數) 作為 LRU key
+    data 必須是 load_cache() 與 version 一起回傳的那份資料，確保快取內容與版本一致
+    回傳: (body bytes, etag)
+    """
+    key = (version, path, query)
+    with _render_lock:
+        if key in _render_cache:
+            _render_cache.move_to_end(key)
+            return _render_cache[key]
+
+    func = ROUTES[path][0]
+    result = func(data, **dict(query))
+    body = json.dumps(result, ensure_ascii=False).encode("utf-8")
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+    # 指標的空結果多半是暫時性的下載失敗，不放進快取以免整段期間都回傳空值
+    if ROUTES[path][1] and _is_empty(result):
+        return body, etag
+
+    with _render_lock:
+        _render_cache[key] = (body, etag)
+        _render_cache.move_to_end(key)
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return body, etag
+
+class QueryHandler(BaseHTTPRequestHandler):
+    def _send(self, status, body=b"", etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send(status, json.dumps({"error": message}, ensure_ascii=False).encode("utf-8"))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path.rstrip("/") or "/"
+        if path not in ROUTES:
+            return self._error(404, f"未知路徑 {path}")
+
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if path == "/breadth/last":
+            query.setdefault("n", "20")
+
+        _, needs_ticker, uses_data = ROUTES[path]
+        if needs_ticker and "ticker" not in query:
+            return self._error(400, "缺少 ticker 參數")
+
+        # 指標依賴的股價 / BWIBBU 會更新，版本另外加上 PRICE_CACHE_TTL 區間編號，
+        # 與 pbr_core 的股價快取同步過期
+        version, data = load_cache()
+        if not uses_data:
+            version, data = "", {}
+        if needs_ticker:
+            version += f"@{int(time.time() // PRICE_CACHE_TTL)}"
+
+        try:
+            body, etag = render(version, data, path, tuple(sorted(query.items())))
+        except (TypeError, ValueError) as e:
+            return self._error(400, f"參數錯誤：{e}")
+        except Exception as e:
+            return self._error(500, f"查詢失敗：{e}")
+
+        if etag in self.headers.get("If-None-Match", ""):
+            return self._send(304, etag=etag)
+        self._send(200, body, etag)
+
+def serve(host="127.0.0.1", port=8000, json_name=JSON_NAME):
+    global JSON_NAME
+    JSON_NAME = json_name
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    print(f"查詢服務啟動於 http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("查詢服務已停止")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    serve()
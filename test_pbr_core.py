@@ -0,0 +1,141 @@
+import os
+import json
+import random
+import numpy as np
+import pandas as pd
+import pytest
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pbr_core
+
+# ------------------------ 舊版實作 (基準) ------------------------
+def legacy_pick_first_workday_each_week(data_dict):
+    parsed = {datetime.strptime(k, "%Y%m%d").date(): v for k, v in data_dict.items()}
+
+    weeks = defaultdict(list)
+    for d in parsed.keys():
+        year, week_num, _ = d.isocalendar()
+        weeks[(year, week_num)].append(d)
+
+    result = {}
+    for (year, week_num), days in weeks.items():
+        days_sorted = sorted(days)
+        for wd in range(7):
+            for d in days_sorted:
+                if d.weekday() == wd:
+                    result[d.strftime("%Y%m%d")] = parsed[d]
+                    break
+            else:
+                continue
+            break
+
+    return result
+
+def legacy_get_stock_close_batch(date_keys, stock_id, ticker_cls):
+    if stock_id == "^TWII":
+        ticker_symbol = stock_id
+    else:
+        ticker_symbol = f"{stock_id}.TW"
+
+    dates = [datetime.strptime(d, "%Y%m%d").date() for d in date_keys]
+    start = min(dates)
+    end = max(dates) + timedelta(days=1)
+
+    hist = ticker_cls(ticker_symbol).history(start=start, end=end)
+
+    result = {}
+    for d in dates:
+        d_str = d.strftime("%Y%m%d")
+        try:
+            close_price = hist.loc[d.strftime("%Y-%m-%d")]["Close"]
+            result[d_str] = float(close_price)
+        except KeyError:
+            result[d_str] = None
+    return result
+
+# ------------------------ fixtures ------------------------
+@pytest.fixture(scope="module")
+def cache():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "json_data.json")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+@pytest.fixture
+def fake_ticker(monkeypatch):
+    """以固定的隨機歷史股價取代 yfinance，部分交易日刻意缺資料"""
+    idx = pd.date_range("2021-12-01", "2026-04-30", freq="B", tz="Asia/Taipei")
+    idx = idx[np.random.default_rng(1).random(len(idx)) > 0.1]
+    hist = pd.DataFrame({"Close": np.random.default_rng(2).random(len(idx)) * 100}, index=idx)
+    calls = []
+    # 設為 True 時下一次 history() 回傳空表，模擬 yfinance 暫時失敗
+    fail_next = [False]
+
+    class FakeTicker:
+        def __init__(self, symbol):
+            self.symbol = symbol
+
+        def history(self, start, end):
+            calls.append((self.symbol, start, end))
+            if fail_next[0]:
+                fail_next[0] = False
+                return pd.DataFrame()
+            return hist[(hist.index.date >= start) & (hist.index.date < end)]
+
+    FakeTicker.fail_next = fail_next
+
+    monkeypatch.setattr(pbr_core.yf, "Ticker", FakeTicker)
+    pbr_core.clear_price_cache()
+    yield FakeTicker, calls
+    pbr_core.clear_price_cache()
+
+# ------------------------ pick_first_workday_each_week ------------------------
+def test_pick_first_workday_matches_legacy_on_cache(cache):
+    expected = legacy_pick_first_workday_each_week(cache)
+    result = pbr_core.pick_first_workday_each_week(cache)
+    assert result == expected
+    assert list(result) == list(expected)
+
+def test_pick_first_workday_matches_legacy_on_shuffled_input(cache):
+    items = list(cache.items())
+    random.Random(0).shuffle(items)
+    data = dict(items[:300])
+    expected = legacy_pick_first_workday_each_week(data)
+    result = pbr_core.pick_first_workday_each_week(data)
+    assert list(result.items()) == list(expected.items())
+
+@pytest.mark.parametrize("data", [
+    {},
+    {"20201231": 1, "20210101": 2, "20210103": 3, "20210104": 4},
+    {"20240106": 5, "20240107": 6},
+])
+def test_pick_first_workday_edge_cases(data):
+    assert list(pbr_core.pick_first_workday_each_week(data).items()) == \
+        list(legacy_pick_first_workday_each_week(data).items())
+
+# ------------------------ get_stock_close_batch ------------------------
+@pytest.mark.parametrize("stock_id", ["2330", "^TWII"])
+def test_get_stock_close_batch_matches_legacy(cache, fake_ticker, stock_id):
+    ticker_cls, _ = fake_ticker
+    weekly = list(legacy_pick_first_workday_each_week(cache))
+    for keys in [list(cache)[-200:], weekly, list(cache)[:50], list(cache)[-1:]]:
+        expected = legacy_get_stock_close_batch(keys, stock_id, ticker_cls)
+        result = pbr_core.get_stock_close_batch(keys, stock_id)
+        assert list(result.items()) == list(expected.items())
+
+def test_get_stock_close_batch_reuses_cached_history(cache, fake_ticker):
+    _, calls = fake_ticker
+    keys = list(cache)[-100:]
+    pbr_core.get_stock_close_batch(keys, "2330")
+    pbr_core.get_stock_close_batch(keys[10:20], "2330")
+    assert len(calls) == 1
+
+def test_get_stock_close_batch_does_not_cache_empty_history(cache, fake_ticker):
+    ticker_cls, calls = fake_ticker
+    keys = list(cache)[-100:]
+    ticker_cls.fail_next[0] = True
+
+    assert all(v is None for v in pbr_core.get_stock_close_batch(keys, "2330").values())
+    result = pbr_core.get_stock_close_batch(keys, "2330")
+    assert len(calls) == 2
+    assert list(result.items()) == list(legacy_get_stock_close_batch(keys, "2330", ticker_cls).items())